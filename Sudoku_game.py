@@ -6,8 +6,11 @@
 #
 import copy
 import datetime
+import functools
 from Sudoku_solver import Sudoku
 from Sudoku_solver import get_square_coors
+from Sudoku_solver import parse_puzzle, format_puzzle
+from Sudoku_solver import TracePlayer
 import pygame
 import sys
 import time
@@ -33,6 +36,19 @@ NOTE_FONT = pygame.font.SysFont("Trebuchet", 20)
 HEADING_FONT = pygame.font.SysFont("Trebuchet", 40)
 ALLOWED_MISTAKES = 3
 ALLOWED_HINTS = 5
+PLAYBACK_FPS = 60
+
+
+@functools.lru_cache(maxsize=16)
+def solve_trace(puzzle: str) -> tuple:
+    """
+    Solves a puzzle while recording a trace of every place and erase event, cached per puzzle
+    :param puzzle: the unsolved puzzle in the line-per-puzzle format
+    :return: tuple of True if the puzzle was solved (False if otherwise) and the trace as bytes
+    """
+    trace = bytearray()
+    solved = Sudoku(board=parse_puzzle(puzzle)).solve(trace=trace)
+    return solved, bytes(trace)
 
 
 class Puzzle(object):
@@ -134,13 +150,65 @@ class Puzzle(object):
 
     def visual_solve(self, window: pygame.surface, delay: float) -> bool:
         """
-        Creates a Sudoku object and calls solve on it with visualization on
-        :param window:
-        :param delay:
-        :return:
-        """
-        sudo = Sudoku(board=self.board)
-        return sudo.solve(self.squares, window, delay)
+        Records (or reuses) the solve trace of the board and plays it back onto the squares until ENTER is pressed
+        UP/DOWN double/halve the playback speed, P pauses, LEFT/RIGHT pause and step a second of playback back/forward,
+        BACKSPACE rewinds to the start and SPACE skips to the end
+        :param window: pygame window
+        :param delay: seconds between two events of the trace, 0 shows the solution immediately
+        :return: True if the puzzle could be solved, False if otherwise
+        """
+        solved, trace = solve_trace(format_puzzle(self.board))
+        player = TracePlayer(self.board, trace)
+        # Events played per second
+        speed = 1 / (delay or DELAY)
+        position = 0.0 if delay else float(player.steps)
+        paused = False
+        clock = pygame.time.Clock()
+        while True:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    sys.exit()
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_ESCAPE:
+                        print("Game ended.")
+                        pygame.quit()
+                        sys.exit()
+                    # 13 is the event key representing ENTER
+                    elif event.key == 13:
+                        return solved
+                    elif event.key == pygame.K_UP:
+                        speed *= 2
+                    elif event.key == pygame.K_DOWN:
+                        speed = max(1.0, speed / 2)
+                    elif event.key == pygame.K_p:
+                        paused = not paused
+                    elif event.key == pygame.K_LEFT:
+                        paused = True
+                        position = max(0.0, position - speed)
+                    elif event.key == pygame.K_RIGHT:
+                        paused = True
+                        position = min(float(player.steps), position + speed)
+                    elif event.key == pygame.K_BACKSPACE:
+                        position = 0.0
+                    elif event.key == pygame.K_SPACE:
+                        position = float(player.steps)
+            seconds = clock.tick(PLAYBACK_FPS) / 1000
+            if not paused:
+                position = min(position + seconds * speed, player.steps)
+
+            # Redraw only the squares that changed since the last frame
+            rects = []
+            for r, c in player.seek(int(position)):
+                sq = self.squares[r][c]
+                val = player.cells[r * 9 + c]
+                if val:
+                    sq.replace(val)
+                else:
+                    sq.delete()
+                sq.draw(window)
+                rects.append(sq.rect)
+            pygame.display.update(rects)
 
     def draw(self, s: pygame.surface) -> None:
         """
@@ -444,6 +512,10 @@ def instructions():
     print("|              H = Ask for a hint             |")
     print("|    N = enable/disable notes for a square    |")
     print("|       SPACEBAR = Solve puzzle entirely      |")
+    print("|  While solving: UP/DOWN = faster/slower,    |")
+    print("|  P = pause, LEFT/RIGHT = step back/forward, |")
+    print("|  BACKSPACE = start, SPACEBAR = end,         |")
+    print("|  ENTER = close the solution                 |")
     print("| WASD = up, down, left, right, respectively  |")
     print("| UP,DOWN,LEFT,RIGHT = up, down, left, right  |")
     print("|                 ESC = QUIT                  |")
@@ -569,4 +641,5 @@ def play(delay=0.001) -> None:
             sys.exit()
 
 
-play(delay=DELAY)
+if __name__ == "__main__":
+    play(delay=DELAY)
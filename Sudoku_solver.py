@@ -5,10 +5,15 @@
 # This program implements basic features of object-oriented programming and the recursive backtracking algorithm to
 # devise a solution to an incomplete Sudoku puzzle
 #
+import argparse
+import math
+import multiprocessing
+import os
+import queue
+import sys
+import threading
 import time
 
-import pygame
-
 
 def get_square_coors(indices: tuple) -> list:
     """
@@ -46,6 +51,93 @@ def get_square_coors(indices: tuple) -> list:
     return coors
 
 
+# Solve traces are a flat sequence of 2-byte little-endian events, each packing the cell index (r * 9 + c) into the
+# high bits and the value placed there into the low 4 bits, where a value of 0 means the cell was erased
+TRACE_EVENT_SIZE = 2
+
+
+def encode_event(r: int, c: int, val: int) -> bytes:
+    """
+    Encodes a single place/erase event of a solve trace
+    :param r: row index
+    :param c: col index
+    :param val: value placed in the cell, 0 if the cell was erased
+    :return: bytes of length TRACE_EVENT_SIZE
+    """
+    return ((r * 9 + c) << 4 | val).to_bytes(TRACE_EVENT_SIZE, "little")
+
+
+def decode_trace(trace: bytes, start=0, stop=None):
+    """
+    Decodes the events of a solve trace
+    :param trace: bytes made of events produced by encode_event
+    :param start: index of the first event to decode
+    :param stop: index to stop decoding at, None decodes until the end of the trace
+    :return: generator of (row, col, val) tuples
+    """
+    if stop is None:
+        stop = len(trace) // TRACE_EVENT_SIZE
+    for i in range(start * TRACE_EVENT_SIZE, stop * TRACE_EVENT_SIZE, TRACE_EVENT_SIZE):
+        event = trace[i] | trace[i + 1] << 8
+        r, c = divmod(event >> 4, 9)
+        yield r, c, event & 0xF
+
+
+class TracePlayer(object):
+    """
+    Plays back a solve trace (see encode_event) onto a board and can seek to any step in either direction
+    """
+    checkpoint_every = 4096
+
+    def __init__(self, board: list, trace: bytes):
+        """
+        Initializes a TracePlayer object
+        :param board: the unsolved board the trace was recorded on
+        :param trace: the solve trace
+        """
+        self.trace = trace
+        self.steps = len(trace) // TRACE_EVENT_SIZE
+        self.step = 0
+        self.cells = bytearray(val for row in board for val in row)
+
+        # Snapshot the cells every checkpoint_every events so seeking never replays more than that many events
+        self.checkpoints = [bytes(self.cells)]
+        cells = bytearray(self.cells)
+        for i, (r, c, val) in enumerate(decode_trace(trace), 1):
+            cells[r * 9 + c] = val
+            if i % self.checkpoint_every == 0:
+                self.checkpoints.append(bytes(cells))
+
+    def seek(self, step: int) -> list:
+        """
+        Moves the board to the state right after the given number of events
+        :param step: number of events to apply, clamped to the length of the trace
+        :return: list of the (row, col) indices of the cells whose values changed
+        """
+        step = max(0, min(step, self.steps))
+        # Replay forwards from the current state when it's close, otherwise from the nearest earlier checkpoint
+        if self.step <= step < self.step + self.checkpoint_every:
+            cells = bytearray(self.cells)
+            start = self.step
+        else:
+            start = step // self.checkpoint_every * self.checkpoint_every
+            cells = bytearray(self.checkpoints[start // self.checkpoint_every])
+        for r, c, val in decode_trace(self.trace, start, step):
+            cells[r * 9 + c] = val
+
+        changed = [divmod(i, 9) for i in range(81) if cells[i] != self.cells[i]]
+        self.cells = cells
+        self.step = step
+        return changed
+
+    def done(self) -> bool:
+        """
+        Checks if every event of the trace has been played
+        :return: True if it has, False if otherwise
+        """
+        return self.step == self.steps
+
+
 class Sudoku(object):
 
     def __init__(self, board=None, file=None):
@@ -66,13 +158,12 @@ class Sudoku(object):
             for i in range(9):
                 self.board.append(nums[i*9:(i*9)+9])
 
-    def solve(self, squares=None, screen=None, delay=None) -> bool:
+    def solve(self, trace=None) -> bool:
         """
         Using a backtracking algorithm, this function sets and resets the values of empty cells to numbers between
         1 and 9 until all of the cells are filled with values that abide by Sudoku's rules
-        :param squares: list of square objects that can be manipulated if they exist (for visualization purposes)
-        :param screen: a pygame screen
-        :param delay: the delay factor for the visualization
+        :param trace: bytearray that every place and erase event is appended to if it exists (see encode_event), used
+        to visualize the solve
         :return: True if all the cells can be properly filled with values from 1-9, False if otherwise
         """
         # Iterate over all the rows and columns
@@ -84,30 +175,16 @@ class Sudoku(object):
                         # Validate that the value at that position works
                         if self.validate(r, c, val):
                             self.board[r][c] = val
-                            # If Square objects are passed
-                            if squares:
-                                # Retrieve the affected Square object and call the replace method on it
-                                # Then draw the affected square onto the screen
-                                affected = squares[r][c]
-                                affected.replace(val)
-                                time.sleep(delay)
-                                affected.draw(screen)
-                                pygame.display.update(affected.rect)
+                            if trace is not None:
+                                trace += encode_event(r, c, val)
                             # If all the solutions for the next empty cells make logical sense return True
-                            if self.solve(squares, screen, delay):
+                            if self.solve(trace):
                                 return True
                             else:
                                 # Otherwise reassign the current value to 0 and redo the backtracking process
-                                # (for visualization)
                                 self.board[r][c] = 0
-                                if squares:
-                                    # Retrieve the changed Square object and call the delete method on it
-                                    # Then draw the affect square onto the screen
-                                    to_change = squares[r][c]
-                                    to_change.delete()
-                                    time.sleep(delay)
-                                    to_change.draw(screen)
-                                    pygame.display.update(to_change.rect)
+                                if trace is not None:
+                                    trace += encode_event(r, c, 0)
                     # If all the values have been tried and don't work then this solution is incorrect
                     return False
         # If there are no more empty cells return True
@@ -152,6 +229,204 @@ class Sudoku(object):
             return False
         return True
 
+    def candidates(self, r: int, c: int) -> list:
+        """
+        Returns the values that can be placed at self.board[r][c] without violating the rules of Sudoku
+        :param r: int value corresponding to a row position
+        :param c: int value corresponding to a col position
+        :return: sorted list of the legal values from 1-9
+        """
+        used = set(self.board[r])
+        used.update(self.board[i][c] for i in range(9))
+        used.update(self.board[i][j] for i, j in get_square_coors((r, c)))
+        return [val for val in range(1, 10) if val not in used]
+
+    def most_constrained(self) -> tuple:
+        """
+        Finds the empty cell with the fewest legal values (minimum remaining values)
+        :return: tuple of the (row, col) indices and the list of legal values, (None, None) if the board is full
+        """
+        best = None
+        best_vals = None
+        for r in range(9):
+            for c in range(9):
+                if not self.board[r][c]:
+                    vals = self.candidates(r, c)
+                    if best is None or len(vals) < len(best_vals):
+                        best, best_vals = (r, c), vals
+                        # A cell with no candidates means this branch is dead and one with a single candidate can't
+                        # be beaten
+                        if len(vals) <= 1:
+                            return best, best_vals
+        return best, best_vals
+
+    def solve_mrv(self) -> bool:
+        """
+        Using a backtracking algorithm that always branches on the empty cell with the fewest legal values (minimum
+        remaining values), this function fills the board in place. Much faster than solve() on hard puzzles
+        :return: True if all the cells can be properly filled with values from 1-9, False if otherwise
+        """
+        best, best_vals = self.most_constrained()
+        # If there are no more empty cells return True
+        if best is None:
+            return True
+        r, c = best
+        for val in best_vals:
+            self.board[r][c] = val
+            if self.solve_mrv():
+                return True
+        self.board[r][c] = 0
+        return False
+
+    def solve_parallel(self, workers=None, split_every=1000) -> bool:
+        """
+        Speculatively searches the subtrees of the most constrained cell's values in separate worker processes and fills
+        the board in place with the first solution found, cancelling the remaining workers. Workers whose subtree is
+        still large after split_every nodes hand their shallowest untried branches back to idle workers
+        :param workers: number of worker processes, defaults to the number of CPUs
+        :param split_every: number of nodes a worker searches between checks for cancellation and idle workers
+        :return: True if all the cells can be properly filled with values from 1-9, False if otherwise
+        """
+        best, best_vals = self.most_constrained()
+        # If there are no more empty cells return True
+        if best is None:
+            return True
+        if not best_vals:
+            return False
+        r, c = best
+
+        tasks = multiprocessing.Queue()
+        results = multiprocessing.Queue()
+        stop = multiprocessing.Event()
+        # Number of subtrees queued or being searched, and number of workers waiting for a subtree
+        outstanding = multiprocessing.Value("i", len(best_vals))
+        idle = multiprocessing.Value("i", 0)
+        for val in best_vals:
+            board = [row[:] for row in self.board]
+            board[r][c] = val
+            tasks.put(board)
+
+        processes = [multiprocessing.Process(target=_parallel_worker,
+                                             args=(tasks, results, stop, outstanding, idle, split_every), daemon=True)
+                     for _ in range(workers or os.cpu_count() or 1)]
+        for p in processes:
+            p.start()
+        try:
+            while True:
+                try:
+                    solution = results.get(timeout=0.1)
+                    break
+                except queue.Empty:
+                    # A worker that crashed never gives back its subtree so the others would wait forever
+                    for p in processes:
+                        if p.exitcode:
+                            raise RuntimeError(f"parallel solve worker exited with code {p.exitcode}")
+                    if not any(p.is_alive() for p in processes):
+                        # The worker that found the solution exits right after queueing it, so give it a moment to
+                        # arrive before giving up
+                        try:
+                            solution = results.get(timeout=1)
+                            break
+                        except queue.Empty:
+                            raise RuntimeError("all parallel solve workers exited without a result")
+        finally:
+            # Cancel the workers that are still searching
+            stop.set()
+            for p in processes:
+                p.terminate()
+                p.join()
+        if solution is None:
+            return False
+        # Copy into the existing rows so references to them see the solution
+        for row, sol in zip(self.board, solution):
+            row[:] = sol
+        return True
+
+    def solutions(self, limit=None):
+        """
+        Yields every solution of the board without modifying self.board. The search runs on a single working copy of
+        the board and each solution is yielded as an immutable snapshot. Snapshots share the row tuples of the previous
+        snapshot and only the rows the search changed since then are rebuilt
+        :param limit: maximum number of solutions to yield, None yields all of them
+        :return: generator of 9x9 tuples of tuples consisting of numbers from 1-9
+        """
+        if (limit is not None and limit <= 0) or not self.consistent():
+            return
+        work = Sudoku(board=[row[:] for row in self.board])
+        rows = [tuple(row) for row in work.board]
+        # Indices of the rows changed since the last snapshot
+        dirty = set()
+        for n, _ in enumerate(work._search(dirty), 1):
+            for r in dirty:
+                rows[r] = tuple(work.board[r])
+            dirty.clear()
+            yield tuple(rows)
+            if n == limit:
+                return
+
+    def count_solutions(self, limit=None) -> int:
+        """
+        Counts the solutions of the board without modifying self.board or allocating anything per solution. Unlike
+        solutions() it keeps the used values of every row, column and square as bitmasks instead of rescanning the
+        board at every step
+        :param limit: stop counting once this many solutions have been found, None counts all of them
+        :return: the number of solutions found
+        """
+        if (limit is not None and limit <= 0) or not self.consistent():
+            return 0
+        rows, cols, boxes = [0] * 9, [0] * 9, [0] * 9
+        empty = []
+        for r in range(9):
+            for c in range(9):
+                val = self.board[r][c]
+                if val:
+                    bit = 1 << val
+                    rows[r] |= bit
+                    cols[c] |= bit
+                    boxes[r // 3 * 3 + c // 3] |= bit
+                else:
+                    empty.append((r, c, r // 3 * 3 + c // 3))
+        return _count_solutions(rows, cols, boxes, empty, limit or 0)
+
+    def has_unique_solution(self) -> bool:
+        """
+        Checks if the board has exactly one solution, as a well-formed Sudoku puzzle should
+        :return: True if there is exactly one solution, False if otherwise
+        """
+        return self.count_solutions(limit=2) == 1
+
+    def _search(self, dirty=None):
+        """
+        Enumerates the solutions of self.board in place using the same minimum remaining values search as solve_mrv().
+        Yields (nothing) each time the board is completely filled, and the board is reset once the generator finishes
+        :param dirty: set that the index of every row the search changes is added to if it exists
+        :return: generator that yields None once per solution
+        """
+        best, best_vals = self.most_constrained()
+        # If there are no more empty cells this is a solution
+        if best is None:
+            yield
+            return
+        r, c = best
+        for val in best_vals:
+            self.board[r][c] = val
+            if dirty is not None:
+                dirty.add(r)
+            yield from self._search(dirty)
+        self.board[r][c] = 0
+
+    def consistent(self) -> bool:
+        """
+        Checks that none of the given (nonzero) values on the board violate the rules of Sudoku
+        :return: True if the givens are consistent, False if otherwise
+        """
+        for r in range(9):
+            for c in range(9):
+                val = self.board[r][c]
+                if val and not self.validate(r, c, val):
+                    return False
+        return True
+
     def __str__(self) -> str:
         """
         Returns an elegant string representation of the board
@@ -213,14 +488,426 @@ class Sudoku(object):
         return [(row,c) for c in range(9) if c != col]
 
 
-def main():
-    board = [[3, 6, 9, 7, 5, 4, 1, 2, 8], [2, 4, 7, 8, 6, 1, 3, 9, 7], [8, 1, 5, 2, 9, 3, 6, 4, 7], [6, 3, 2, 5, 4, 7, 8, 6, 1], [9, 5, 8, 6, 1, 2, 7, 7, 3], [1, 7, 4, 3, 8, 9, 5, 9, 2], [7, 8, 1, 9, 2, 5, 4, 3, 6], [4, 2, 3, 4, 0, 6, 9, 1, 5], [5, 9, 6, 1, 3, 8, 2, 8, 7]]
+# Bitmask of the values 1-9, bit v set meaning v is used
+ALL_VALUES = 0b1111111110
+
+
+def _count_solutions(rows: list, cols: list, boxes: list, empty: list, limit: int) -> int:
+    """
+    Counts the solutions reachable from the given state by always branching on the empty cell with the fewest legal
+    values. Every list is restored before returning
+    :param rows: bitmasks of the values used in each row
+    :param cols: bitmasks of the values used in each column
+    :param boxes: bitmasks of the values used in each square
+    :param empty: list of the (row, col, square) indices of the empty cells
+    :param limit: stop counting once this many solutions have been found, 0 counts all of them
+    :return: the number of solutions found
+    """
+    if not empty:
+        return 1
+    # Find the empty cell with the fewest legal values
+    best = 0
+    best_free = 0
+    best_n = 10
+    for i, (r, c, b) in enumerate(empty):
+        free = ALL_VALUES & ~(rows[r] | cols[c] | boxes[b])
+        n = bin(free).count("1")
+        if n < best_n:
+            best, best_free, best_n = i, free, n
+            if n <= 1:
+                break
+    if not best_free:
+        return 0
+
+    # Take the cell out of the empty list by swapping the last cell into its place
+    cell = empty[best]
+    last = empty.pop()
+    if best < len(empty):
+        empty[best] = last
+    r, c, b = cell
+
+    count = 0
+    free = best_free
+    while free:
+        bit = free & -free
+        free ^= bit
+        rows[r] |= bit
+        cols[c] |= bit
+        boxes[b] |= bit
+        count += _count_solutions(rows, cols, boxes, empty, limit - count if limit else 0)
+        rows[r] ^= bit
+        cols[c] ^= bit
+        boxes[b] ^= bit
+        if limit and count >= limit:
+            break
+
+    # Put the cell back where it was
+    if best < len(empty):
+        empty[best] = cell
+        empty.append(last)
+    else:
+        empty.append(cell)
+    return count
+
+
+def _parallel_worker(tasks, results, stop, outstanding, idle, split_every) -> None:
+    """
+    Worker process of Sudoku.solve_parallel. Takes boards off the task queue and searches them until one of the workers
+    finds a solution or every subtree has been exhausted
+    :param tasks: queue of boards to search
+    :param results: queue the solved board is put on, or None once every subtree turned out to have no solution
+    :param stop: event set when the search is over
+    :param outstanding: shared count of the subtrees queued or being searched
+    :param idle: shared count of the workers waiting for a subtree
+    :param split_every: number of nodes searched between checks for cancellation and idle workers
+    :return: None
+    """
+    with idle.get_lock():
+        idle.value += 1
+    while not stop.is_set():
+        try:
+            board = tasks.get(timeout=0.05)
+        except queue.Empty:
+            continue
+        with idle.get_lock():
+            idle.value -= 1
+
+        sudoku = Sudoku(board=board)
+        if _search_subtree(sudoku, tasks, stop, outstanding, idle, split_every):
+            stop.set()
+            results.put(sudoku.board)
+            return
+
+        with idle.get_lock():
+            idle.value += 1
+        with outstanding.get_lock():
+            outstanding.value -= 1
+            # If this was the last subtree there is no solution
+            if not outstanding.value:
+                results.put(None)
+                return
+
+
+def _search_subtree(sudoku, tasks, stop, outstanding, idle, split_every) -> bool:
+    """
+    Searches a board with the minimum remaining values search of solve_mrv() using an explicit stack so that untried
+    branches can be handed off to idle workers
+    :param sudoku: Sudoku object whose board is filled in place
+    :param tasks: queue that handed off boards are put on
+    :param stop: event set when the search is over
+    :param outstanding: shared count of the subtrees queued or being searched
+    :param idle: shared count of the workers waiting for a subtree
+    :param split_every: number of nodes searched between checks for cancellation and idle workers
+    :return: True if the board was solved, False if the subtree has no solution or the search was cancelled
+    """
+    board = sudoku.board
+    # Each frame holds the cell being branched on and its untried values
+    stack = []
+    nodes = 0
+    while True:
+        best, best_vals = sudoku.most_constrained()
+        # If there are no more empty cells return True
+        if best is None:
+            return True
+        stack.append((best, best_vals[::-1]))
+
+        # Try the next untried value, backtracking out of the frames that have none left
+        while stack:
+            (r, c), vals = stack[-1]
+            if vals:
+                board[r][c] = vals.pop()
+                break
+            board[r][c] = 0
+            stack.pop()
+        else:
+            return False
+
+        nodes += 1
+        if nodes % split_every == 0:
+            if stop.is_set():
+                return False
+            if idle.value:
+                _donate_branches(board, stack, tasks, outstanding)
+
+
+def _donate_branches(board: list, stack: list, tasks, outstanding) -> None:
+    """
+    Moves the untried values of the shallowest frame with any left onto the task queue as separate boards
+    :param board: the board being searched
+    :param stack: the search stack of _search_subtree
+    :param tasks: queue that the boards are put on
+    :param outstanding: shared count of the subtrees queued or being searched
+    :return: None
+    """
+    for depth, ((r, c), vals) in enumerate(stack):
+        if vals:
+            break
+    else:
+        return
+
+    boards = []
+    for val in vals:
+        donated = [row[:] for row in board]
+        # Undo every assignment made at or below this frame before branching on the donated value
+        for (rr, cc), _ in stack[depth:]:
+            donated[rr][cc] = 0
+        donated[r][c] = val
+        boards.append(donated)
+    vals.clear()
+
+    # Count the boards before queueing them so the subtree count can't reach 0 while they're in flight
+    with outstanding.get_lock():
+        outstanding.value += len(boards)
+    for donated in boards:
+        tasks.put(donated)
+
+
+def parse_puzzle(line: str) -> list:
+    """
+    Parses a single line-per-puzzle string into a board
+    :param line: 81 characters read row by row where 1-9 are givens and 0 or '.' are empty cells
+    :return: 9x9 matrix consisting of numbers from 0-9 where 0 represents an empty cell
+    """
+    line = line.strip()
+    if len(line) != 81:
+        raise ValueError(f"expected 81 cells, got {len(line)}")
+    nums = []
+    for ch in line:
+        if ch == ".":
+            nums.append(0)
+        elif ch.isdigit():
+            nums.append(int(ch))
+        else:
+            raise ValueError(f"invalid cell {ch!r}")
+    return [nums[i*9:(i*9)+9] for i in range(9)]
+
+
+def format_puzzle(board: list) -> str:
+    """
+    Formats a board in the line-per-puzzle format
+    :param board: 9x9 matrix consisting of numbers from 0-9
+    :return: string of 81 digits
+    """
+    return "".join(str(val) for row in board for val in row)
+
+
+# Engines usable by the command-line solver, each takes a Sudoku object and fills its board in place
+ENGINES = {
+    "backtrack": Sudoku.solve,
+    "mrv": Sudoku.solve_mrv,
+    "parallel": Sudoku.solve_parallel,
+}
+
+
+def solve_line(job: tuple) -> tuple:
+    """
+    Solves a single puzzle line, intended to be run inside a worker process
+    :param job: tuple of the puzzle line, the engine name and the number of worker processes the parallel engine uses
+    :return: tuple of the puzzle line, the solution line (None if it failed), the error message (None if it
+    succeeded) and the elapsed solve time in seconds
+    """
+    line, engine, workers = job
+    start = time.perf_counter()
+    try:
+        sudoku = Sudoku(board=parse_puzzle(line))
+    except ValueError as e:
+        return line, None, str(e), time.perf_counter() - start
+    if not sudoku.consistent():
+        return line, None, "givens violate the rules of Sudoku", time.perf_counter() - start
+    solved = sudoku.solve_parallel(workers) if engine == "parallel" else ENGINES[engine](sudoku)
+    if not solved:
+        return line, None, "no solution", time.perf_counter() - start
+    return line, format_puzzle(sudoku.board), None, time.perf_counter() - start
+
+
+def percentile(ordered: list, p: float) -> float:
+    """
+    Returns the p-th percentile of an already sorted list using the nearest-rank method
+    :param ordered: sorted list of numbers
+    :param p: percentile from 0-100
+    :return: the percentile value, 0 if the list is empty
+    """
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def read_puzzles(paths: list):
+    """
+    Yields the non-blank, non-comment lines of the given files, "-" or no files reads from stdin
+    :param paths: list of file paths
+    :return: generator of puzzle lines
+    """
+    for path in paths or ["-"]:
+        f = sys.stdin if path == "-" else open(path, "r")
+        try:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield line
+        finally:
+            if f is not sys.stdin:
+                f.close()
 
-    s = Sudoku(board=board)
-    print(s)
-    s.solve()
-    print(s)
 
+class ProgressReporter(object):
+    """
+    Prints a live progress line to stderr from a background thread so it keeps updating while a slow puzzle is solved
+    """
+
+    def __init__(self, interval: float):
+        """
+        Initializes a ProgressReporter object
+        :param interval: seconds between two reports, 0 disables them
+        """
+        self.interval = interval
+        self.done = 0
+        self.failures = 0
+        self.start = time.perf_counter()
+        # True while an unfinished progress line is on stderr
+        self.shown = False
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self) -> None:
+        """
+        Reports every interval seconds until stop() is called
+        :return: None
+        """
+        while not self.stopped.wait(self.interval):
+            with self.lock:
+                elapsed = time.perf_counter() - self.start
+                print(f"\r{self.done} puzzles  {self.done / elapsed:.1f}/s  {self.failures} failed", end="",
+                      file=sys.stderr, flush=True)
+                self.shown = True
+
+    def begin(self) -> None:
+        """
+        Starts reporting if reports are enabled
+        :return: None
+        """
+        if self.interval:
+            self.thread.start()
+
+    def update(self, done: int, failures: int) -> None:
+        """
+        Updates the counts shown by the next report
+        :param done: number of puzzles processed so far
+        :param failures: number of those puzzles that couldn't be solved
+        :return: None
+        """
+        with self.lock:
+            self.done = done
+            self.failures = failures
+
+    def message(self, text: str) -> None:
+        """
+        Prints a message to stderr on its own line
+        :param text: the message
+        :return: None
+        """
+        with self.lock:
+            self.end_line()
+            print(text, file=sys.stderr)
+
+    def stop(self) -> None:
+        """
+        Stops reporting and finishes the progress line
+        :return: None
+        """
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join()
+        self.end_line()
+
+    def end_line(self) -> None:
+        """
+        Moves stderr past the progress line if one is showing
+        :return: None
+        """
+        if self.shown:
+            print(file=sys.stderr)
+            self.shown = False
+
+
+def main(argv=None) -> int:
+    """
+    Command-line batch solver. Streams puzzles in line-per-puzzle format, writes the solutions in the same format (a
+    failed puzzle is written back unchanged so lines stay aligned) and reports throughput, latency percentiles and
+    failures to stderr
+    :param argv: list of command-line arguments, defaults to sys.argv[1:]
+    :return: exit code, 0 if every puzzle was solved and 1 if otherwise
+    """
+    parser = argparse.ArgumentParser(description="Solve Sudoku puzzles given one per line (81 cells, 0 or . for "
+                                                 "empty cells)")
+    parser.add_argument("files", nargs="*", help="puzzle files to read, - or nothing reads from stdin")
+    parser.add_argument("-e", "--engine", choices=sorted(ENGINES), default="mrv", help="solving engine to use")
+    parser.add_argument("-j", "--workers", type=int,
+                        help="number of worker processes, defaults to 1 (per puzzle and one per CPU with --engine "
+                             "parallel)")
+    parser.add_argument("--chunksize", type=int, default=1,
+                        help="puzzles handed to a worker at a time, raise it for large corpora of easy puzzles")
+    parser.add_argument("-o", "--output", default="-", help="file to write the solutions to, - for stdout")
+    parser.add_argument("--progress", type=float, default=1.0,
+                        help="seconds between live throughput reports, 0 disables them")
+    args = parser.parse_args(argv)
+    if args.workers is None:
+        args.workers = (os.cpu_count() or 1) if args.engine == "parallel" else 1
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.chunksize < 1:
+        parser.error("--chunksize must be at least 1")
+    # Check the inputs before solving so a bad path doesn't stop the stream halfway through
+    for path in args.files:
+        if path != "-":
+            try:
+                open(path, "r").close()
+            except OSError as e:
+                parser.error(f"can't read {path}: {e.strerror}")
+    try:
+        out = sys.stdout if args.output == "-" else open(args.output, "w")
+    except OSError as e:
+        parser.error(f"can't write {args.output}: {e.strerror}")
+    jobs = ((line, args.engine, args.workers) for line in read_puzzles(args.files))
+    # The parallel engine spreads each puzzle over its own worker processes so puzzles are solved one at a time
+    pool = multiprocessing.Pool(args.workers) if args.workers > 1 and args.engine != "parallel" else None
+    results = pool.imap(solve_line, jobs, chunksize=args.chunksize) if pool else map(solve_line, jobs)
+
+    latencies = []
+    failures = 0
+    progress = ProgressReporter(args.progress)
+    start = time.perf_counter()
+    progress.begin()
+    try:
+        for n, (line, solution, error, elapsed) in enumerate(results, 1):
+            latencies.append(elapsed)
+            if solution is None:
+                failures += 1
+                progress.message(f"puzzle {n}: {error}")
+                out.write(line + "\n")
+            else:
+                out.write(solution + "\n")
+            progress.update(n, failures)
+    finally:
+        progress.stop()
+        if pool:
+            pool.terminate()
+        if out is not sys.stdout:
+            out.close()
+        else:
+            out.flush()
 
+    total = time.perf_counter() - start
+    latencies.sort()
+    print(f"solved {len(latencies) - failures}/{len(latencies)} puzzles ({failures} failed) in {total:.3f}s "
+          f"with {args.engine} on {args.workers} worker(s)", file=sys.stderr)
+    print(f"throughput: {len(latencies) / total if total else 0.0:.1f} puzzles/s", file=sys.stderr)
+    print("latency: " + "  ".join(f"p{p}={percentile(latencies, p) * 1000:.3f}ms" for p in (50, 90, 99))
+          + f"  max={(latencies[-1] if latencies else 0.0) * 1000:.3f}ms", file=sys.stderr)
+    return 1 if failures else 0
 
 
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+#
+# Tests for Sudoku_solver.py
+#
+import multiprocessing
+import random
+
+import pytest
+
+import Sudoku_solver
+from Sudoku_solver import Sudoku, parse_puzzle, format_puzzle, encode_event, decode_trace
+from Sudoku_solver import main, percentile, TracePlayer
+
+EASY = "003020600900305001001806400008102900700000008006708200002609500800203009005010300"
+HARD = "800000000003600000070090200050007000000045700000100030001000068008500010090000400"
+
+
+def blanked(puzzle: str, cells: int, seed: int) -> list:
+    """
+    Solves a puzzle and blanks random cells of the solution, sometimes giving one of them a wrong value
+    :param puzzle: puzzle in the line-per-puzzle format
+    :param cells: number of cells to blank
+    :param seed: random seed
+    :return: board that may have no, one or many solutions
+    """
+    rng = random.Random(seed)
+    sudoku = Sudoku(board=parse_puzzle(puzzle))
+    sudoku.solve_mrv()
+    board = sudoku.board
+    blanks = rng.sample(range(81), cells)
+    for p in blanks:
+        board[p // 9][p % 9] = 0
+    if seed % 2:
+        # Give a blank a value that doesn't break the rules locally but usually leaves no solution
+        for p in blanks:
+            r, c = divmod(p, 9)
+            vals = Sudoku(board=board).candidates(r, c)
+            if len(vals) > 1:
+                board[r][c] = vals[-1]
+                break
+    return board
+
+
+def test_parse_and_format_round_trip():
+    assert format_puzzle(parse_puzzle(EASY)) == EASY
+    assert parse_puzzle(EASY.replace("0", ".")) == parse_puzzle(EASY)
+    with pytest.raises(ValueError):
+        parse_puzzle(EASY[:-1])
+
+
+def solved(puzzle: str) -> str:
+    """
+    Solves a puzzle with solve_mrv()
+    :param puzzle: puzzle in the line-per-puzzle format
+    :return: the solution in the line-per-puzzle format
+    """
+    sudoku = Sudoku(board=parse_puzzle(puzzle))
+    sudoku.solve_mrv()
+    return format_puzzle(sudoku.board)
+
+
+def test_percentile():
+    assert percentile([], 50) == 0.0
+    assert percentile([3.0], 0) == percentile([3.0], 99) == 3.0
+    assert percentile([1, 2, 3, 4], 50) == 2
+    assert percentile([1, 2, 3, 4], 100) == 4
+
+
+def test_main_keeps_failed_lines_aligned(tmp_path, capsys):
+    puzzles = tmp_path / "puzzles.txt"
+    puzzles.write_text(f"# comment\n{EASY}\n12345\n\n{EASY.replace('0', '.')}\n")
+    assert main([str(puzzles), "--progress", "0"]) == 1
+    captured = capsys.readouterr()
+    assert captured.out.splitlines() == [solved(EASY), "12345", solved(EASY)]
+    assert "puzzle 2: expected 81 cells, got 5" in captured.err
+    assert "solved 2/3 puzzles (1 failed)" in captured.err
+
+
+def test_main_exit_code_and_output_file(tmp_path, capsys):
+    puzzles = tmp_path / "puzzles.txt"
+    puzzles.write_text(EASY + "\n")
+    output = tmp_path / "solutions.txt"
+    assert main([str(puzzles), "-o", str(output), "--progress", "0"]) == 0
+    assert output.read_text() == solved(EASY) + "\n"
+    assert capsys.readouterr().out == ""
+
+
+def test_main_rejects_bad_paths(tmp_path, capsys):
+    with pytest.raises(SystemExit) as e:
+        main([str(tmp_path / "missing.txt")])
+    assert e.value.code == 2
+    assert "can't read" in capsys.readouterr().err
+
+
+def test_main_workers_give_the_same_output(tmp_path, capsys):
+    puzzles = tmp_path / "puzzles.txt"
+    lines = [EASY, format_puzzle(blanked(EASY, 40, 1)), "bad", EASY, format_puzzle(blanked(EASY, 45, 2))]
+    puzzles.write_text("\n".join(lines) + "\n")
+    outputs = []
+    for workers in ("1", "2"):
+        main([str(puzzles), "-j", workers, "--progress", "0"])
+        outputs.append(capsys.readouterr().out)
+    assert outputs[0] == outputs[1]
+    assert len(outputs[0].splitlines()) == len(lines)
+
+
+def test_main_progress_keeps_messages_on_their_own_lines(tmp_path, capsys):
+    puzzles = tmp_path / "puzzles.txt"
+    puzzles.write_text(f"{HARD}\nbad\n")
+    main([str(puzzles), "--progress", "0.01"])
+    err = capsys.readouterr().err
+    assert "\rpuzzle" not in err and "failedpuzzle" not in err
+    assert any(line.startswith("puzzle 2:") for line in err.splitlines())
+
+
+def test_solutions_match_count_and_leave_board_untouched():
+    board = blanked(EASY, 50, 0)
+    original = [row[:] for row in board]
+    sudoku = Sudoku(board=board)
+    solutions = list(sudoku.solutions())
+    assert len(solutions) == len(set(solutions)) == sudoku.count_solutions()
+    assert sudoku.board == original
+    for solution in solutions:
+        assert Sudoku(board=[list(row) for row in solution]).consistent()
+    assert len(list(sudoku.solutions(limit=2))) == min(2, len(solutions))
+
+
+def test_solutions_share_unchanged_rows():
+    sudoku = Sudoku(board=parse_puzzle(EASY))
+    sudoku.solve_mrv()
+    board = sudoku.board[:6] + [[0] * 9 for _ in range(3)]
+    solutions = list(Sudoku(board=board).solutions(limit=50))
+    assert len(solutions) > 1
+    for prev, cur in zip(solutions, solutions[1:]):
+        for r in range(6):
+            assert prev[r] is cur[r]
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_count_solutions_agrees_with_solutions(seed):
+    sudoku = Sudoku(board=blanked(EASY, 52, seed))
+    expected = sum(1 for _ in sudoku.solutions())
+    assert sudoku.count_solutions() == expected
+    for limit in (1, 2, 7):
+        assert sudoku.count_solutions(limit=limit) == min(limit, expected)
+
+
+def test_count_solutions_limit_on_empty_board():
+    sudoku = Sudoku(board=[[0] * 9 for _ in range(9)])
+    assert sudoku.count_solutions(limit=500) == 500
+    assert sudoku.count_solutions(limit=0) == 0
+    assert sudoku.board == [[0] * 9 for _ in range(9)]
+
+
+def test_has_unique_solution():
+    assert Sudoku(board=parse_puzzle(EASY)).has_unique_solution()
+    assert not Sudoku(board=[[0] * 9 for _ in range(9)]).has_unique_solution()
+
+
+def test_encode_decode_round_trip():
+    for r in range(9):
+        for c in range(9):
+            for val in range(10):
+                event = encode_event(r, c, val)
+                assert len(event) == Sudoku_solver.TRACE_EVENT_SIZE
+                assert next(decode_trace(event)) == (r, c, val)
+    events = [(r, c, (r + c) % 10) for r in range(9) for c in range(9)]
+    trace = b"".join(encode_event(*event) for event in events)
+    assert list(decode_trace(trace)) == events
+    assert list(decode_trace(trace, 10, 20)) == events[10:20]
+
+
+def test_trace_replays_to_solution():
+    sudoku = Sudoku(board=parse_puzzle(EASY))
+    trace = bytearray()
+    assert sudoku.solve(trace=trace)
+    cells = parse_puzzle(EASY)
+    for r, c, val in decode_trace(trace):
+        cells[r][c] = val
+    assert cells == sudoku.board
+
+
+@pytest.mark.parametrize("split_every", [1, 5, 1000])
+def test_solve_parallel_matches_mrv(split_every):
+    expected = Sudoku(board=parse_puzzle(HARD))
+    assert expected.solve_mrv()
+    sudoku = Sudoku(board=parse_puzzle(HARD))
+    rows = list(sudoku.board)
+    assert sudoku.solve_parallel(workers=3, split_every=split_every)
+    assert sudoku.board == expected.board
+    # The board is filled in place, like solve_mrv() does
+    assert all(row is sudoku.board[r] for r, row in enumerate(rows))
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_solve_parallel_agrees_with_count_solutions(seed):
+    board = blanked(HARD, 55, seed)
+    solvable = Sudoku(board=[row[:] for row in board]).count_solutions(limit=1) == 1
+    sudoku = Sudoku(board=board)
+    assert sudoku.solve_parallel(workers=3, split_every=2) == solvable
+    if solvable:
+        assert sudoku.solved() and sudoku.consistent()
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                    reason="the patched search only reaches workers started with fork")
+def test_solve_parallel_fails_fast_when_a_worker_crashes(monkeypatch):
+    def crash(*args):
+        raise ZeroDivisionError
+
+    monkeypatch.setattr(Sudoku_solver, "_search_subtree", crash)
+    with pytest.raises(RuntimeError):
+        Sudoku(board=parse_puzzle(HARD)).solve_parallel(workers=2)
+
+
+def test_trace_player_seek(monkeypatch):
+    # Small checkpoints so seeking crosses several of them
+    monkeypatch.setattr(TracePlayer, "checkpoint_every", 16)
+    board = parse_puzzle(EASY)
+    trace = bytearray()
+    Sudoku(board=[row[:] for row in board]).solve(trace=trace)
+    player = TracePlayer(board, bytes(trace))
+    assert player.steps == len(trace) // Sudoku_solver.TRACE_EVENT_SIZE > 3 * 16
+
+    def replayed(step: int) -> bytearray:
+        cells = bytearray(val for row in board for val in row)
+        for r, c, val in decode_trace(trace, 0, step):
+            cells[r * 9 + c] = val
+        return cells
+
+    rng = random.Random(0)
+    steps = [1, 2, 15, 16, 17, 40, 39, 3, 0, player.steps - 1, player.steps, 5, 100]
+    steps += [rng.randint(0, player.steps) for _ in range(100)]
+    for step in steps:
+        before = bytearray(player.cells)
+        changed = player.seek(step)
+        assert player.step == step
+        assert player.cells == replayed(step)
+        assert sorted(changed) == [divmod(i, 9) for i in range(81) if before[i] != player.cells[i]]
+
+    player.seek(player.steps + 50)
+    assert player.step == player.steps and player.done()
+    assert player.cells == replayed(player.steps)
+    player.seek(-50)
+    assert player.step == 0 and not player.done()
+    assert player.cells == replayed(0)